@@ -7,7 +7,8 @@ from modules import (
     ParticipacaoInvestidores,
     Tickers,
     Momentum,
-    Tendencia
+    Tendencia,
+    Correlacao
     #configuracoes
 )
 
@@ -30,7 +31,8 @@ abas = st.sidebar.radio(
         "📈 Participação Investidores",
         "🔎 Consulta de Empresas",
         "📈 Análise de Momentum",
-        "📈 Tendencia"
+        "📈 Tendencia",
+        "🔗 Correlação"
         #"⚙️ Configurações"
     )
 )
@@ -48,6 +50,8 @@ elif abas == "📈 Análise de Momentum":
      Momentum.show()
 elif abas == "📈 Tendencia":
      Tendencia.show()
+elif abas == "🔗 Correlação":
+     Correlacao.show()
 #elif abas == "🧮⚙️ Configurações":
 #    configuracoes.show()
 
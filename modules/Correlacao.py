@@ -0,0 +1,320 @@
+# modules/Correlacao.py
+import numpy as np
+import pandas as pd
+import streamlit as st
+import plotly.graph_objects as go
+
+from modules.cache_historico import inicio_do_periodo, obter_cache
+from modules.painel_precos import abrir_painel
+from modules.tarefas import ExecutorTarefas, acompanhar, obter_executor
+from modules.Tickers import carregar_dados
+
+# scipy é opcional: sem ele a ordenação usa o autovetor principal
+try:
+    from scipy.cluster.hierarchy import leaves_list, linkage
+except ImportError:
+    linkage = None
+
+# Colunas processadas por vez no produto de matrizes
+TAMANHO_BLOCO = 512
+# Mínimo de datas em comum para um par ter correlação
+MIN_OBSERVACOES = 10
+# Acima disso o heatmap fica pesado demais para o navegador
+MAX_HEATMAP = 300
+
+
+# ===============================
+# Painel de fechamentos alinhados
+# ===============================
+def montar_painel(tarefa, cache, tickers, periodo):
+    """Garante os históricos no painel compartilhado (executado no pool de tarefas).
+
+    Só os tickers ausentes ou desatualizados no painel são baixados. Devolve
+    os tickers com dados, a data inicial e os tickers sem dados: sessões e
+    processos abrem o mesmo painel como views NumPy, sem cópias em pandas.
+    """
+    inicio = inicio_do_periodo(periodo)
+    painel, sem_dados = cache.garantir_painel(tickers, inicio, progresso=tarefa.reportar)
+    com_dados = [t for t in tickers if painel is not None and t in painel.colunas]
+    return com_dados, inicio, sem_dados
+
+
+def retornos_log(precos):
+    """Log-retornos por ativo (matriz datas x tickers); dias sem pregão ficam NaN.
+
+    O preço é propagado antes da diferença, então o retorno do dia após
+    um feriado cobre todo o intervalo (moeda x B3, por exemplo).
+    """
+    precos = np.asarray(precos, dtype=np.float32)
+    # Forward-fill vetorizado: índice da última linha válida de cada coluna
+    linhas = np.where(np.isnan(precos), 0, np.arange(len(precos))[:, None])
+    np.maximum.accumulate(linhas, axis=0, out=linhas)
+    preenchido = np.take_along_axis(precos, linhas, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.diff(np.log(preenchido), axis=0)
+    r[np.isnan(precos[1:])] = np.nan
+    return r
+
+
+# ===============================
+# Correlação em blocos
+# ===============================
+def _preparar_bloco(retornos, medias, inicio, fim):
+    # Valores centrados com NaN -> 0, máscara e quadrados de um bloco de colunas (float64)
+    x = retornos[:, inicio:fim].astype(np.float64)
+    m = ~np.isnan(x)
+    x -= medias[inicio:fim]
+    x[~m] = 0.0
+    return x, m.astype(np.float64), x * x
+
+
+def correlacao_blocada(retornos, bloco=TAMANHO_BLOCO, min_obs=MIN_OBSERVACOES):
+    """Matriz de correlação N x N (float32) com pares completos, a partir de retornos T x N.
+
+    Para cada par usa só as datas em que os dois ativos têm retorno (um
+    ativo com metade do histórico, ou cripto com fins de semana, não tem a
+    correlação puxada para zero). As estatísticas de cada par saem de
+    produtos em blocos da matriz de valores X (NaN -> 0) e da máscara M:
+    contagens M^T M, somas X^T M, somas de quadrados (X^2)^T M e produtos
+    cruzados X^T X. X, M e X^2 só existem para dois blocos de colunas por
+    vez, então a memória além da entrada e do resultado fica em T x bloco.
+    Pares com menos de `min_obs` datas em comum ficam NaN.
+    """
+    # Centrar pela média da coluna não muda a correlação e reduz cancelamento
+    with np.errstate(invalid="ignore"):
+        medias = np.nan_to_num(np.nanmean(retornos, axis=0, dtype=np.float64))
+
+    n = retornos.shape[1]
+    corr = np.empty((n, n), dtype=np.float32)
+    for i in range(0, n, bloco):
+        xi, mi, x2i = _preparar_bloco(retornos, medias, i, i + bloco)
+        # Só o triângulo superior é calculado; o inferior é espelhado
+        for j in range(i, n, bloco):
+            xj, mj, x2j = (xi, mi, x2i) if j == i else _preparar_bloco(retornos, medias, j, j + bloco)
+            cont = mi.T @ mj
+            sx, sy = xi.T @ mj, mi.T @ xj
+            sxx, syy = x2i.T @ mj, mi.T @ x2j
+            sxy = xi.T @ xj
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cov = sxy - sx * sy / cont
+                var = (sxx - sx * sx / cont) * (syy - sy * sy / cont)
+                b = cov / np.sqrt(var)
+            b[(cont < min_obs) | ~(var > 0)] = np.nan
+            corr[i:i + bloco, j:j + bloco] = b
+            if j != i:
+                corr[j:j + bloco, i:i + bloco] = b.T
+    np.clip(corr, -1, 1, out=corr)
+    return corr
+
+
+def ordem_cluster(corr, bloco=TAMANHO_BLOCO):
+    """Ordem dos ativos por clusterização hierárquica (ou espectral, sem scipy).
+
+    Não cria cópias N x N densas: a distância vai direto para a forma
+    condensada em float32 (o triângulo superior, linha a linha; o linkage
+    do scipy ainda faz sua própria cópia em float64) e o fallback
+    espectral usa iteração de potência com produtos em blocos.
+    """
+    n = corr.shape[0]
+    if n < 3:
+        return np.arange(n)
+    if linkage is not None:
+        dist = np.empty(n * (n - 1) // 2, dtype=np.float32)
+        k = 0
+        for i in range(n - 1):
+            linha = dist[k:k + n - i - 1]
+            linha[:] = corr[i, i + 1:]
+            k += n - i - 1
+        # d = sqrt((1 - c) / 2), com pares sem correlação (NaN) tratados como c = 0
+        np.nan_to_num(dist, copy=False, nan=0.0)
+        np.subtract(1, dist, out=dist)
+        dist *= 0.5
+        np.clip(dist, 0, None, out=dist)
+        np.sqrt(dist, out=dist)
+        return leaves_list(linkage(dist, method="average"))
+
+    # Autovetor principal por iteração de potência
+    v = np.full(n, 1 / np.sqrt(n))
+    for _ in range(100):
+        w = np.concatenate([np.nan_to_num(corr[i:i + bloco].astype(np.float64)) @ v for i in range(0, n, bloco)])
+        w /= np.linalg.norm(w) or 1.0
+        convergiu = np.abs(w - v).max() < 1e-6
+        v = w
+        if convergiu:
+            break
+    return np.argsort(v)
+
+
+def pares_extremos(corr, tickers, k=20, bloco=TAMANHO_BLOCO):
+    """Os k pares mais e menos correlacionados, percorrendo a matriz em blocos."""
+    n = corr.shape[0]
+    candidatos = []
+    for i in range(0, n, bloco):
+        parte = corr[i:i + bloco].astype(np.float64)
+        linhas, colunas = np.indices(parte.shape)
+        linhas = linhas + i
+        # Mantém só o triângulo superior, sem a diagonal
+        valido = (colunas > linhas) & ~np.isnan(parte)
+        valores, li, co = parte[valido], linhas[valido], colunas[valido]
+        if valores.size == 0:
+            continue
+        m = min(k, valores.size)
+        for idx in (np.argpartition(-valores, m - 1)[:m], np.argpartition(valores, m - 1)[:m]):
+            candidatos.append(np.column_stack([valores[idx], li[idx], co[idx]]))
+    if not candidatos:
+        return pd.DataFrame(columns=["Ativo A", "Ativo B", "Correlação"]), pd.DataFrame(columns=["Ativo A", "Ativo B", "Correlação"])
+
+    todos = np.vstack(candidatos)
+    todos = np.unique(todos, axis=0)
+    df = pd.DataFrame({
+        "Ativo A": [tickers[int(a)] for a in todos[:, 1]],
+        "Ativo B": [tickers[int(b)] for b in todos[:, 2]],
+        "Correlação": todos[:, 0],
+    })
+    return df.nlargest(k, "Correlação"), df.nsmallest(k, "Correlação")
+
+
+def calcular_correlacoes(tarefa, painel, tickers, inicio, janela, agrupar):
+    """Matrizes completa e móvel e ordem dos ativos (executado no pool de tarefas)."""
+    tarefa.reportar(0.05, "Lendo o painel...")
+    _, precos = painel.recorte("Close", tickers, inicio)
+    if len(precos) < 3:
+        return None
+    retornos = retornos_log(precos)
+    del precos
+    tarefa.reportar(0.2, "Correlação do período completo...")
+    completa = correlacao_blocada(retornos)
+    tarefa.reportar(0.5, "Correlação da janela móvel...")
+    movel = correlacao_blocada(retornos[-janela:]) if janela < len(retornos) else completa
+    tarefa.reportar(0.8, "Agrupando ativos..." if agrupar else "Finalizando...")
+    ordem = ordem_cluster(completa) if agrupar else np.arange(len(tickers))
+    return completa, movel, ordem
+
+
+# Pool próprio para as matrizes: um cálculo por vez e só os 2 últimos
+# resultados (N x N cada) guardados por processo. Pedidos com a mesma
+# versão do painel e parâmetros reaproveitam a mesma tarefa
+@st.cache_resource
+def obter_executor_matrizes():
+    return ExecutorTarefas(max_workers=1, max_guardadas=2)
+
+
+# ===============================
+# Interface Streamlit
+# ===============================
+def show():
+    st.title("🔗 Correlação entre Ativos Salvos")
+    st.markdown("""
+    Mostra como os ativos da lista de empresas salvas se movem juntos:
+    - Correlação dos log-retornos no período completo e na janela móvel
+    - Ordenação por clusterização hierárquica (ativos parecidos ficam lado a lado)
+    - Pares mais e menos correlacionados
+    """)
+
+    if "df_empresas" not in st.session_state:
+        st.session_state.df_empresas = carregar_dados()
+    salvos = st.session_state.df_empresas["Ticker"].dropna().astype(str).str.strip().tolist()
+    extras = st.text_input("Tickers adicionais (separados por vírgula):", "")
+    tickers = list(dict.fromkeys(salvos + [t.strip().upper() for t in extras.split(",") if t.strip()]))
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        periodo = st.selectbox("Período:", ["6mo", "1y", "2y", "5y"], index=1)
+    with col2:
+        janela = st.slider("Janela móvel (pregões):", 20, 250, 60)
+    with col3:
+        agrupar = st.checkbox("Ordenar por cluster", value=True)
+
+    executor = obter_executor()
+    if st.button("🔗 Calcular correlações"):
+        if len(tickers) < 2:
+            st.warning("Salve ou informe ao menos dois tickers.")
+            return
+        tarefa = executor.submeter(montar_painel, obter_cache(), tuple(tickers), periodo,
+                                   chave=("Correlacao", tuple(tickers), periodo))
+        st.session_state.correlacao_tarefa = tarefa.id
+
+    tarefa = executor.obter(st.session_state.get("correlacao_tarefa"))
+    if tarefa is None:
+        return
+    if not tarefa.finalizada:
+        acompanhar(tarefa.id)
+        return
+
+    try:
+        if tarefa.erro is not None:
+            raise tarefa.erro
+        nomes, inicio, sem_dados = tarefa.resultado
+        for ticker in sem_dados:
+            st.warning(f"Nenhum dado encontrado para {ticker}")
+        if len(nomes) < 2:
+            st.error("Dados insuficientes para calcular correlações.")
+            return
+
+        # Painel compartilhado: só as colunas dos tickers pedidos, a partir do período.
+        # O cálculo roda fora da thread do script; mudar a janela ou o agrupamento
+        # agenda uma nova tarefa e a página segue respondendo
+        painel = abrir_painel()
+        matrizes = obter_executor_matrizes()
+        calculo = matrizes.submeter(
+            calcular_correlacoes, painel, tuple(nomes), inicio, janela, agrupar,
+            chave=(painel.versao, tuple(nomes), inicio, janela, agrupar),
+        )
+        if not calculo.finalizada:
+            acompanhar(calculo.id, executor=matrizes)
+            return
+        if calculo.erro is not None:
+            raise calculo.erro
+        if calculo.resultado is None:
+            st.error("Dados insuficientes para calcular correlações.")
+            return
+        completa, movel, ordem = calculo.resultado
+
+        # ---------------------------
+        # Heatmaps
+        # ---------------------------
+        rotulos = [nomes[i] for i in ordem]
+        if len(nomes) <= MAX_HEATMAP:
+            for titulo, matriz in [("📊 Correlação – período completo", completa),
+                                   (f"📉 Correlação – últimos {janela} pregões", movel)]:
+                st.subheader(titulo)
+                fig = go.Figure(go.Heatmap(
+                    z=matriz[np.ix_(ordem, ordem)], x=rotulos, y=rotulos,
+                    zmin=-1, zmax=1, colorscale="RdBu", reversescale=True
+                ))
+                fig.update_layout(height=max(400, 18 * len(nomes)), yaxis_autorange="reversed")
+                st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info(f"{len(nomes)} ativos: heatmap omitido, veja os pares abaixo.")
+
+        # ---------------------------
+        # Pares extremos
+        # ---------------------------
+        mais, menos = pares_extremos(completa, nomes)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("🤝 Mais correlacionados")
+            st.dataframe(mais.style.format({"Correlação": "{:.2f}"}), use_container_width=True)
+        with col2:
+            st.subheader("↔️ Menos correlacionados")
+            st.dataframe(menos.style.format({"Correlação": "{:.2f}"}), use_container_width=True)
+
+        # ---------------------------
+        # Correlação móvel de um par
+        # ---------------------------
+        st.subheader("📈 Correlação móvel de um par")
+        c1, c2 = st.columns(2)
+        a = c1.selectbox("Ativo A:", nomes, index=0)
+        b = c2.selectbox("Ativo B:", nomes, index=1)
+        datas, precos = painel.recorte("Close", [a, b], inicio)
+        par = retornos_log(precos)
+        ra = pd.Series(par[:, 0], index=datas[1:])
+        rb = pd.Series(par[:, 1], index=datas[1:])
+        st.line_chart(ra.rolling(janela, min_periods=janela // 2).corr(rb), use_container_width=True)
+
+        if len(nomes) <= MAX_HEATMAP:
+            csv = pd.DataFrame(completa, index=nomes, columns=nomes).to_csv().encode("utf-8")
+            st.download_button("📥 Baixar matriz de correlação (CSV)", csv, file_name="correlacao.csv")
+
+    except Exception as e:
+        st.error(f"⚠️ Erro: {e}")
@@ -1,9 +1,12 @@
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 from datetime import datetime
 import plotly.graph_objects as go
 
+from modules import aovivo
+from modules.cache_historico import baixar_ajustado, obter_cache
+from modules.tarefas import acompanhar, obter_executor
+
 def show():
     st.set_page_config(page_title="Stock Analyzer", layout="wide")
     st.title("📈 Stock Analyzer — Resumo Mensal e Série Temporal")
@@ -17,15 +20,17 @@ def show():
     - Download dos dados em CSV
     """)
 
+    cache = obter_cache()
+    executor = obter_executor()
+
     # ===============================
     # Função para baixar dados
     # ===============================
-    @st.cache_data
     def carregar_dados(ticker, start, end):
-        df = yf.download(ticker, start=start, end=end, auto_adjust=True)
+        # Cache compartilhado entre sessões: fatia o histórico já baixado
+        df = cache.obter(ticker, start, end, baixar_ajustado, ajustado=True)
         if df.empty:
             raise ValueError("Nenhum dado retornado. Verifique o ticker.")
-        df = df.copy()
         df.reset_index(inplace=True)
         if "Date" not in df.columns:
             df.rename(columns={df.columns[0]: "Date"}, inplace=True)
@@ -104,6 +109,18 @@ def show():
         dia_df = dia_df[dia_df["Contagem"] > 0]
         return dia_df
 
+    # ===============================
+    # Análise completa (executada no pool de tarefas)
+    # ===============================
+    def analisar(tarefa, ticker, start, end):
+        tarefa.reportar(0.1, "Carregando dados...")
+        df = carregar_dados(ticker, start, end)
+        df = normalize_columns(df)
+        tarefa.reportar(0.6, "Calculando resumo mensal...")
+        resumo = resumo_mensal_detalhado(df)
+        df_dias_min = dias_menor_preco(df)
+        return ticker, df, resumo, df_dias_min
+
     # ===============================
     # Interface Streamlit
     # ===============================
@@ -116,12 +133,19 @@ def show():
         end = st.date_input("Data final:", datetime.today())
 
     if st.button("🔍 Buscar dados"):
+        # A sessão guarda só o id: o resultado sobrevive a reruns e pedidos
+        # idênticos de outras sessões reaproveitam a mesma tarefa
+        tarefa = executor.submeter(analisar, ticker, start, end, chave=("DiaMenorValor", ticker, start, end))
+        st.session_state.dmv_tarefa = tarefa.id
+
+    tarefa = executor.obter(st.session_state.get("dmv_tarefa"))
+    if tarefa is not None and not tarefa.finalizada:
+        acompanhar(tarefa.id)
+    elif tarefa is not None:
         try:
-            with st.spinner("Carregando dados..."):
-                df = carregar_dados(ticker, start, end)
-                df = normalize_columns(df)
-                resumo = resumo_mensal_detalhado(df)
-                df_dias_min = dias_menor_preco(df)
+            if tarefa.erro is not None:
+                raise tarefa.erro
+            ticker, df, resumo, df_dias_min = tarefa.resultado
 
             st.success("✅ Dados carregados com sucesso!")
 
@@ -179,10 +203,36 @@ def show():
             # Métricas rápidas
             # ---------------------------
             st.subheader("📊 Indicadores")
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Preço Máximo", f"{df['High'].max():.2f}")
-            col2.metric("Preço Mínimo", f"{df['Low'].min():.2f}")
-            col3.metric("Variação (%)", f"{((df['Close'].iloc[-1]/df['Close'].iloc[0]-1)*100):.2f}%")
+            intervalo = aovivo.controles("dmv")
+            maximo, minimo = df["High"].max(), df["Low"].min()
+            primeiro, ultimo_dia = df["Close"].iloc[0], df["Date"].iloc[-1]
+
+            # No modo ao vivo só esta linha de métricas é reexecutada: a barra
+            # do pregão atual é combinada aos agregados já calculados
+            @st.fragment(run_every=intervalo)
+            def indicadores():
+                alta, baixa, ultimo = maximo, minimo, df["Close"].iloc[-1]
+                barra = aovivo.barra_do_dia(ticker) if intervalo else None
+                if barra is not None and not barra.empty and ultimo_dia <= barra.index[-1] <= pd.Timestamp(end):
+                    alta = max(alta, barra["High"].iloc[-1])
+                    baixa = min(baixa, barra["Low"].iloc[-1])
+                    ultimo = barra["Close"].iloc[-1]
+
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Preço Máximo", f"{alta:.2f}")
+                col2.metric("Preço Mínimo", f"{baixa:.2f}")
+                col3.metric("Variação (%)", f"{((ultimo/primeiro-1)*100):.2f}%")
+                if intervalo:
+                    st.caption(f"🔴 Ao vivo • último preço: {ultimo:.2f}")
+
+            indicadores()
+
+            stats = cache.estatisticas()
+            st.caption(
+                f"🗄️ Cache: {stats['hits']} hits • {stats['hits_painel']} do painel • {stats['misses']} misses • "
+                f"{stats['evictions']} evictions • {stats['entradas']} tickers • "
+                f"{stats['bytes']/1e6:.1f} / {stats['max_bytes']/1e6:.0f} MB"
+            )
 
             st.markdown(
                 """
@@ -1,10 +1,13 @@
 # modules/Momentum.py
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import plotly.graph_objects as go
 from pathlib import Path
 
+from modules import aovivo
+from modules.cache_historico import baixar_ajustado, inicio_do_periodo, obter_cache
+from modules.tarefas import acompanhar, obter_executor
+
 CSV_FILE = Path("empresas_salvas.csv")
 
 def carregar_dados():
@@ -15,6 +18,25 @@ def carregar_dados():
             return pd.DataFrame(columns=["Empresa", "Ticker", "Exchange"])
     return pd.DataFrame(columns=["Empresa", "Ticker", "Exchange"])
 
+def calcular_momentum(tarefa, cache, tickers, periodo, janela):
+    """Carrega os tickers e calcula o momentum (executado no pool de tarefas).
+
+    Os históricos vêm do cache compartilhado (LRU ou painel mapeado) até o
+    último pregão encerrado; a barra de hoje é anexada pela página.
+    """
+    inicio, hoje = inicio_do_periodo(periodo), pd.Timestamp.today().normalize()
+    dfs, sem_dados = {}, []
+    for i, ticker in enumerate(tickers):
+        tarefa.reportar(i / len(tickers), f"Carregando {ticker} ({i+1}/{len(tickers)})...")
+        data = cache.obter(ticker, inicio, hoje, baixar_ajustado, ajustado=True)
+        if data.empty:
+            sem_dados.append(ticker)
+            continue
+        data = data[["Close"]].dropna()
+        data["Momentum"] = data["Close"] - data["Close"].shift(janela)
+        dfs[ticker] = data
+    return dfs, sem_dados, janela
+
 class Momentum:
     @staticmethod
     def show():
@@ -48,88 +70,134 @@ class Momentum:
         periodo = st.selectbox("Período de análise:", ["1mo", "3mo", "6mo", "1y", "2y"], index=3)
         janela = st.slider("Período do Momentum (em dias):", 5, 60, 14)
 
+        executor = obter_executor()
         if st.button("Gerar Análise"):
             if not tickers:
                 st.warning("Digite ao menos um ticker para gerar o gráfico.")
                 return
-
+            chave = ("Momentum", tuple(tickers), periodo, janela)
+            tarefa = executor.submeter(calcular_momentum, obter_cache(), tuple(tickers), periodo, janela, chave=chave)
+            st.session_state.momentum_tarefa = tarefa.id
+
+        # Downloads rodam no pool de tarefas; os widgets continuam respondendo
+        tarefa = executor.obter(st.session_state.get("momentum_tarefa"))
+        if tarefa is None:
+            return
+        if not tarefa.finalizada:
+            acompanhar(tarefa.id)
+            return
+
+        if tarefa.erro is not None:
+            st.error(f"❌ Erro ao obter dados: {tarefa.erro}")
+            return
+        dfs, sem_dados, janela = tarefa.resultado
+        for ticker in sem_dados:
+            st.warning(f"Nenhum dado encontrado para {ticker}")
+
+        if not dfs:
+            st.error("Nenhum dado válido encontrado para os tickers informados.")
+            return
+
+        # O resultado da tarefa é compartilhado entre sessões: o modo ao vivo
+        # trabalha sobre uma cópia própria da sessão
+        if st.session_state.get("momentum_sessao_tarefa") != tarefa.id:
+            st.session_state.momentum_dfs = {t: d.copy() for t, d in dfs.items()}
+            st.session_state.momentum_figs = Momentum.montar_graficos(st.session_state.momentum_dfs, janela)
+            st.session_state.momentum_sessao_tarefa = tarefa.id
+
+        intervalo = aovivo.controles("momentum")
+
+        # Só este fragmento é reexecutado no modo ao vivo
+        @st.fragment(run_every=intervalo)
+        def painel():
             try:
-                dfs = {}
-                for ticker in tickers:
-                    data = yf.download(ticker, period=periodo, progress=False)
-                    if data.empty:
-                        st.warning(f"Nenhum dado encontrado para {ticker}")
+                dfs = st.session_state.momentum_dfs
+                fig_price, fig_momentum = st.session_state.momentum_figs
+                # Barra de hoje a cada execução (o cache para no último pregão
+                # encerrado); no modo ao vivo, o fragmento repete isto a cada intervalo.
+                # Uma única busca em lote para todos os tickers do gráfico
+                barras = aovivo.barras_do_dia(list(dfs))
+                for i, ticker in enumerate(dfs):
+                    df, n = aovivo.mesclar_barras(dfs[ticker], barras[ticker])
+                    if not n:
                         continue
-                    data = data[["Close"]].dropna()
-                    data["Momentum"] = data["Close"] - data["Close"].shift(janela)
-                    dfs[ticker] = data
-
-                if not dfs:
-                    st.error("Nenhum dado válido encontrado para os tickers informados.")
-                    return
-
-                # --- Gráfico 1: Preços ---
-                fig_price = go.Figure()
-                for ticker, df in dfs.items():
-                    fig_price.add_trace(go.Scatter(
-                        x=df.index, y=df["Close"], mode="lines", name=ticker
-                    ))
-
-                fig_price.update_layout(
-                    title="Preço de Fechamento",
-                    xaxis_title="Data",
-                    yaxis_title="Preço",
-                    template="plotly_white",
-                    height=500
-                )
-                st.plotly_chart(fig_price, use_container_width=True)
+                    # Recalcula o momentum só das linhas novas e troca só o trace do ticker
+                    df.iloc[-n:, df.columns.get_loc("Momentum")] = (
+                        df["Close"] - df["Close"].shift(janela)
+                    ).iloc[-n:].values
+                    dfs[ticker] = df
+                    fig_price.data[i].update(x=df.index, y=df["Close"])
+                    fig_momentum.data[i].update(x=df.index, y=df["Momentum"])
 
-                # --- Gráfico 2: Momentum ---
-                fig_momentum = go.Figure()
-                for ticker, df in dfs.items():
-                    fig_momentum.add_trace(go.Scatter(
-                        x=df.index, y=df["Momentum"], mode="lines", name=f"{ticker} Momentum"
-                    ))
-
-                fig_momentum.add_hline(y=0, line_dash="dash", line_color="gray")
-                fig_momentum.update_layout(
-                    title=f"Momentum Comparativo ({janela} dias)",
-                    xaxis_title="Data",
-                    yaxis_title="Momentum",
-                    template="plotly_white",
-                    height=500
-                )
+                st.plotly_chart(fig_price, use_container_width=True)
                 st.plotly_chart(fig_momentum, use_container_width=True)
-
-                # --- Interpretação automática ---
-                momentum_final = []
-                for ticker, df in dfs.items():
-                    if not df["Momentum"].dropna().empty:
-                        ultimo_valor = df["Momentum"].iloc[-1]
-                        momentum_final.append((ticker, ultimo_valor))
-
-                if momentum_final:
-                    df_rank = pd.DataFrame(momentum_final, columns=["Ticker", "Momentum"]).sort_values(
-                        "Momentum", ascending=False
-                    )
-                    st.subheader("🏁 Ranking de Momentum Atual")
-                    st.dataframe(df_rank.style.format({"Momentum": "{:.2f}"}))
-
-                    # Mostra top 3
-                    top3 = df_rank.head(3)
-                    top_text = " | ".join([f"{t} ({m:.2f})" for t, m in top3.values])
-                    st.success(f"Ativos com maior momentum: {top_text}")
-
-                    # Interpretação rápida do 1º colocado
-                    top1_ticker, top1_valor = top3.iloc[0]
-                    if top1_valor > 0:
-                        st.info(f"➡️ {top1_ticker} lidera com momentum **positivo** ({top1_valor:.2f}), indicando tendência de alta.")
-                    else:
-                        st.warning(f"⚠️ {top1_ticker} lidera, mas com momentum **negativo** ({top1_valor:.2f}), indicando fraqueza no curto prazo.")
-
+                Momentum.mostrar_ranking(dfs)
             except Exception as e:
                 st.error(f"❌ Erro ao obter dados: {e}")
 
+        painel()
+
+    @staticmethod
+    def montar_graficos(dfs, janela):
+        # --- Gráfico 1: Preços ---
+        fig_price = go.Figure()
+        for ticker, df in dfs.items():
+            fig_price.add_trace(go.Scatter(
+                x=df.index, y=df["Close"], mode="lines", name=ticker
+            ))
+
+        fig_price.update_layout(
+            title="Preço de Fechamento",
+            xaxis_title="Data",
+            yaxis_title="Preço",
+            template="plotly_white",
+            height=500
+        )
+
+        # --- Gráfico 2: Momentum ---
+        fig_momentum = go.Figure()
+        for ticker, df in dfs.items():
+            fig_momentum.add_trace(go.Scatter(
+                x=df.index, y=df["Momentum"], mode="lines", name=f"{ticker} Momentum"
+            ))
+
+        fig_momentum.add_hline(y=0, line_dash="dash", line_color="gray")
+        fig_momentum.update_layout(
+            title=f"Momentum Comparativo ({janela} dias)",
+            xaxis_title="Data",
+            yaxis_title="Momentum",
+            template="plotly_white",
+            height=500
+        )
+        return fig_price, fig_momentum
+
+    @staticmethod
+    def mostrar_ranking(dfs):
+        # --- Interpretação automática ---
+        momentum_final = []
+        for ticker, df in dfs.items():
+            if not df["Momentum"].dropna().empty:
+                ultimo_valor = df["Momentum"].iloc[-1]
+                momentum_final.append((ticker, ultimo_valor))
+
+        if momentum_final:
+            df_rank = pd.DataFrame(momentum_final, columns=["Ticker", "Momentum"]).sort_values(
+                "Momentum", ascending=False
+            )
+            st.subheader("🏁 Ranking de Momentum Atual")
+            st.dataframe(df_rank.style.format({"Momentum": "{:.2f}"}))
+
+            # Mostra top 3
+            top3 = df_rank.head(3)
+            top_text = " | ".join([f"{t} ({m:.2f})" for t, m in top3.values])
+            st.success(f"Ativos com maior momentum: {top_text}")
+
+            # Interpretação rápida do 1º colocado
+            top1_ticker, top1_valor = top3.iloc[0]
+            if top1_valor > 0:
+                st.info(f"➡️ {top1_ticker} lidera com momentum **positivo** ({top1_valor:.2f}), indicando tendência de alta.")
+            else:
+                st.warning(f"⚠️ {top1_ticker} lidera, mas com momentum **negativo** ({top1_valor:.2f}), indicando fraqueza no curto prazo.")
 
 # --- Expõe show() no nível do módulo ---
 def show():
@@ -1,10 +1,10 @@
 import re
 import numpy as np
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
 import streamlit as st
-import plotly.express as px
+import plotly.graph_objects as go
+
+from modules.provedores import obter_provedor
 
 
 # --- Função auxiliar: converte strings de valores com sufixos (mi, bi, etc.) em float ---
@@ -60,6 +60,78 @@ def _parse_value(x):
     return result
 
 
+# --- Acumulados em formato largo (uma coluna por tipo de investidor) ---
+MODOS_ACUMULADO = {
+    "Período completo": "total",
+    "No ano (YTD)": "ytd",
+    "Últimos 30 dias": 30,
+    "Últimos 90 dias": 90,
+}
+
+
+class FluxoAcumulado:
+    """Somas prefixadas dos fluxos diários de uma versão da tabela.
+
+    `prefixo[i]` é a soma das i primeiras linhas, então qualquer janela é
+    uma subtração de duas linhas do prefixo. Todos os modos (total, YTD,
+    30d, 90d) saem da mesma matriz numa única passada vetorizada, feita
+    uma vez na construção; o objeto é somente leitura depois disso.
+    """
+
+    def __init__(self, datas, valores, colunas):
+        self.colunas = list(colunas)
+        self.datas = np.asarray(datas, dtype="datetime64[ns]")
+        incremento = np.nan_to_num(np.asarray(valores, dtype=float))
+        self.prefixo = np.vstack([np.zeros((1, len(self.colunas))), np.cumsum(incremento, axis=0)])
+        self.modos = self._calcular_modos()
+
+    def _calcular_modos(self):
+        fim = self.prefixo[1:]
+        inicios = {"total": np.zeros(len(self.datas), dtype=int)}
+        # YTD: primeira linha do ano de cada data (datas já ordenadas)
+        anos = self.datas.astype("datetime64[Y]")
+        inicios["ytd"] = np.searchsorted(anos, anos, side="left")
+        # Janelas móveis de calendário: (t - n dias, t]
+        for n in (30, 90):
+            inicios[n] = np.searchsorted(self.datas, self.datas - np.timedelta64(n, "D"), side="right")
+
+        index = pd.DatetimeIndex(self.datas)
+        return {
+            modo: pd.DataFrame(fim - self.prefixo[inicio], index=index, columns=self.colunas)
+            for modo, inicio in inicios.items()
+        }
+
+
+@st.cache_data(ttl=900, show_spinner=False)
+def carregar_fluxo():
+    df, update_info = obter_provedor().fluxo_b3()
+    if df is None:
+        return None, None, None, None, None
+
+    df.columns = [c.strip() for c in df.columns]
+
+    date_col = df.columns[0]
+    df[date_col] = pd.to_datetime(df[date_col], dayfirst=True, errors="coerce")
+    df = df.dropna(subset=[date_col])
+
+    # --- Converte valores ---
+    value_cols = [c for c in df.columns if c != date_col and not re.search(r'total|variaç', c, flags=re.I)]
+    for c in value_cols:
+        df[c] = df[c].apply(_parse_value)
+
+    df = df.sort_values(by=date_col).reset_index(drop=True)
+    # Identifica o conteúdo da tabela: revisões de linhas antigas mudam a versão
+    versao = str(pd.util.hash_pandas_object(df[[date_col] + value_cols], index=False).sum())
+    return df, date_col, value_cols, update_info, versao
+
+
+# Um acumulado por versão da tabela, compartilhado por todas as sessões:
+# "Período completo" sempre bate com a tabela exibida
+@st.cache_resource(max_entries=4, show_spinner=False)
+def acumular_fluxo(versao, _df, date_col, value_cols):
+    return FluxoAcumulado(_df[date_col], _df[list(value_cols)], value_cols)
+
+
 # --- Função principal ---
 def show():
     st.title("💰 Fluxo Acumulado e Participação por Tipo de Investidor – B3")
@@ -68,57 +140,38 @@ def show():
     Dados: [dadosdemercado.com.br/fluxo](https://www.dadosdemercado.com.br/fluxo)
     """)
 
-    url = "https://www.dadosdemercado.com.br/fluxo"
-
     try:
-        # --- Scraping ---
-        response = requests.get(url, timeout=15, headers={"User-Agent": "Mozilla/5.0"})
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        table = soup.find("table")
-        if table is None:
+        # --- Scraping (ou arquivo local, conforme o provedor configurado) ---
+        df, date_col, value_cols, update_info, versao = carregar_fluxo()
+        if df is None:
             st.error("⚠️ Não encontrei tabela na página.")
             return
 
-        df = pd.read_html(str(table))[0]
-        df.columns = [c.strip() for c in df.columns]
-
-        date_col = df.columns[0]
-        df[date_col] = pd.to_datetime(df[date_col], dayfirst=True, errors="coerce")
-        df = df.dropna(subset=[date_col])
-
-        # --- Converte valores ---
-        value_cols = [c for c in df.columns if c != date_col and not re.search(r'total|variaç', c, flags=re.I)]
-        for c in value_cols:
-            df[c] = df[c].apply(_parse_value)
-
-        df = df.sort_values(by=date_col).reset_index(drop=True)
-
         st.subheader("📅 Fluxo Diário (R$)")
         st.dataframe(df, use_container_width=True)
 
-        # --- Cálculo de acumulado ---
-        df_cum = df.copy()
-        for c in value_cols:
-            df_cum[c] = df[c].cumsum()
+        # --- Cálculo de acumulado (uma vez por versão da tabela) ---
+        acum = acumular_fluxo(versao, df, date_col, tuple(value_cols))
+
+        modo_label = st.radio("Acumular:", list(MODOS_ACUMULADO), horizontal=True)
+        df_cum = acum.modos[MODOS_ACUMULADO[modo_label]]
 
-        # --- Gráfico de linha: fluxo acumulado ---
-        df_melt = df_cum.melt(id_vars=date_col, var_name="Investidor", value_name="Fluxo Acumulado (R$)")
+        # --- Gráfico de linha: fluxo acumulado (um trace por investidor) ---
         st.subheader("📈 Evolução Acumulada – Quem está adicionando ou retirando capital")
-        fig_line = px.line(
-            df_melt,
-            x=date_col,
-            y="Fluxo Acumulado (R$)",
-            color="Investidor",
-            markers=False,
-            title="Fluxo Acumulado por Tipo de Investidor",
+        fig_line = go.Figure()
+        for c in value_cols:
+            fig_line.add_trace(go.Scatter(x=df_cum.index, y=df_cum[c], mode="lines", name=c))
+        fig_line.update_layout(
+            title=f"Fluxo Acumulado por Tipo de Investidor – {modo_label}",
+            xaxis_title=date_col,
+            yaxis_title="Fluxo Acumulado (R$)",
+            hovermode="x unified",
+            legend_title_text="Tipo de Investidor",
         )
-        fig_line.update_layout(hovermode="x unified", legend_title_text="Tipo de Investidor")
         st.plotly_chart(fig_line, use_container_width=True)
 
         # --- Ranking final ---
-        latest = df_cum.iloc[-1][value_cols].sort_values(ascending=False)
+        latest = df_cum.iloc[-1].sort_values(ascending=False)
         result_df = latest.reset_index()
         result_df.columns = ["Investidor", "Fluxo Acumulado (R$)"]
         result_df["Fluxo Acumulado (R$) Num"] = result_df["Fluxo Acumulado (R$)"]
@@ -126,13 +179,12 @@ def show():
             lambda x: f"R$ {x/1e9:.2f} bi" if abs(x) > 1e9 else f"R$ {x/1e6:.2f} mi"
         )
 
-        st.subheader("🏆 Ranking – Quem mais adicionou / retirou dinheiro no período")
+        st.subheader(f"🏆 Ranking – Quem mais adicionou / retirou dinheiro ({modo_label.lower()})")
         st.dataframe(result_df[["Investidor", "Fluxo Acumulado (R$)"]], use_container_width=True)
 
         # --- Atualização ---
-        update_info = soup.find("p", class_="text-muted")
         if update_info:
-            st.caption(f"📆 {update_info.text.strip()}")
+            st.caption(f"📆 {update_info}")
 
     except Exception as e:
         st.error(f"❌ Erro ao obter/processar dados: {e}")
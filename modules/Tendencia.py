@@ -1,30 +1,78 @@
 # modules/DolarTendencia.py
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from modules import aovivo
+from modules.cache_historico import baixar_ajustado, inicio_do_periodo, obter_cache
+
+# Maior janela usada pelos indicadores de rolling (MA50)
+_JANELA_MAX = 50
+
+
+def calcular_indicadores(df):
+    # Calcula os 5 indicadores principais
+    df["MA20"] = df["Close"].rolling(20).mean()          # Média móvel curta
+    df["MA50"] = df["Close"].rolling(50).mean()          # Média móvel longa
+    df["RSI"] = 100 - (100 / (1 + df["Close"].pct_change().clip(lower=0).rolling(14).mean() /
+                              abs(df["Close"].pct_change()).rolling(14).mean()))
+    # EMAs guardadas para o MACD poder ser atualizado incrementalmente
+    df["EMA12"] = df["Close"].ewm(span=12, adjust=False).mean()
+    df["EMA26"] = df["Close"].ewm(span=26, adjust=False).mean()
+    df["MACD"] = df["EMA12"] - df["EMA26"]
+    df["Signal"] = df["MACD"].ewm(span=9, adjust=False).mean()
+    df["Volatility"] = df["Close"].pct_change().rolling(20).std() * 100
+    return df
+
+
+def atualizar_indicadores(df, n):
+    """Recalcula os indicadores só das `n` últimas linhas (modo ao vivo)."""
+    if n >= len(df) - 1:
+        return calcular_indicadores(df)
+
+    # Rolling: basta a cauda que cobre a maior janela
+    cauda = calcular_indicadores(df.iloc[-(n + _JANELA_MAX + 1):].copy())
+    for col in ["MA20", "MA50", "RSI", "Volatility"]:
+        df.iloc[-n:, df.columns.get_loc(col)] = cauda[col].iloc[-n:].values
+
+    # EWM: recursão a partir da última linha que não mudou
+    def ewm_incremental(valores, anterior, span):
+        alpha = 2 / (span + 1)
+        saida = []
+        for v in valores:
+            anterior = alpha * v + (1 - alpha) * anterior
+            saida.append(anterior)
+        return saida
+
+    base = df.iloc[-(n + 1)]
+    close = df["Close"].iloc[-n:].values
+    ema12 = ewm_incremental(close, base["EMA12"], 12)
+    ema26 = ewm_incremental(close, base["EMA26"], 26)
+    macd = [a - b for a, b in zip(ema12, ema26)]
+    df.iloc[-n:, df.columns.get_loc("EMA12")] = ema12
+    df.iloc[-n:, df.columns.get_loc("EMA26")] = ema26
+    df.iloc[-n:, df.columns.get_loc("MACD")] = macd
+    df.iloc[-n:, df.columns.get_loc("Signal")] = ewm_incremental(macd, base["Signal"], 9)
+    return df
+
+
 class DolarTendencia:
     @staticmethod
     def show():
         st.title("📈 Tendência do Dólar (USD/BRL) – Indicadores Yahoo Finance")
 
-        # Baixa dados do último ano
+        # Dados do último ano pelo cache compartilhado (uma vez por dia e por sessão),
+        # até o último pregão encerrado; a barra de hoje é mesclada no painel abaixo
         ticker = "USDBRL=X"
-        df = yf.download(ticker, period="1y", interval="1d").dropna()
-
-        if df.empty:
-            st.error("Não foi possível obter dados do Yahoo Finance.")
-            return
-
-        # Calcula os 5 indicadores principais
-        df["MA20"] = df["Close"].rolling(20).mean()          # Média móvel curta
-        df["MA50"] = df["Close"].rolling(50).mean()          # Média móvel longa
-        df["RSI"] = 100 - (100 / (1 + df["Close"].pct_change().clip(lower=0).rolling(14).mean() /
-                                  abs(df["Close"].pct_change()).rolling(14).mean()))
-        df["MACD"] = df["Close"].ewm(span=12, adjust=False).mean() - df["Close"].ewm(span=26, adjust=False).mean()
-        df["Signal"] = df["MACD"].ewm(span=9, adjust=False).mean()
-        df["Volatility"] = df["Close"].pct_change().rolling(20).std() * 100
+        hoje = pd.Timestamp.today().normalize()
+        if st.session_state.get("tendencia_carregado_em") != hoje:
+            df = obter_cache().obter(ticker, inicio_do_periodo("1y"), hoje, baixar_ajustado, ajustado=True).dropna()
+            if df.empty:
+                st.error("Não foi possível obter dados do Yahoo Finance.")
+                return
+            df = calcular_indicadores(df)
+            st.session_state.tendencia_df = df
+            st.session_state.tendencia_carregado_em = hoje
 
         st.subheader("Indicadores utilizados")
         st.markdown("""
@@ -35,37 +83,58 @@ class DolarTendencia:
         5️⃣ **Volatilidade (20 dias)** – mostra intensidade das variações recentes
         """)
 
-        # Plot
-        st.subheader("📊 Gráfico do Dólar e Médias Móveis")
-        fig, ax = plt.subplots(figsize=(10, 5))
-        ax.plot(df.index, df["Close"], label="Fechamento", color="black")
-        ax.plot(df.index, df["MA20"], label="MA20", color="blue", linestyle="--")
-        ax.plot(df.index, df["MA50"], label="MA50", color="orange", linestyle="--")
-        ax.legend()
-        ax.set_title("USD/BRL - Últimos 12 meses")
-        ax.set_ylabel("Cotação (R$)")
-        st.pyplot(fig)
-
-        # Exibe métricas resumidas
-        st.subheader("📋 Resumo dos Indicadores (última data)")
-        last = df.iloc[-1]
-        st.write(pd.DataFrame({
-            "Indicador": ["MA20", "MA50", "RSI", "MACD", "Volatilidade"],
-            "Valor": [last["MA20"], last["MA50"], last["RSI"], last["MACD"], last["Volatility"]]
-        }).set_index("Indicador"))
-
-        # Interpretação automática
-        st.subheader("🧭 Interpretação da Tendência Atual")
-        tendencia = ""
-        if last["MA20"] > last["MA50"]:
-            tendencia = "alta (curto prazo acima do médio prazo)"
-        elif last["MA20"] < last["MA50"]:
-            tendencia = "baixa (curto prazo abaixo do médio prazo)"
-        else:
-            tendencia = "neutra"
-
-        rsi_status = "sobrecomprado" if last["RSI"] > 70 else "sobrevendido" if last["RSI"] < 30 else "neutro"
-
-        st.success(f"Tendência de {tendencia}. RSI indica mercado {rsi_status}. "
-                   f"Volatilidade atual: {last['Volatility']:.2f}%.")
+        intervalo = aovivo.controles("tendencia")
+
+        # Só este fragmento é reexecutado no modo ao vivo
+        @st.fragment(run_every=intervalo)
+        def painel():
+            # Barra de hoje atualizada a cada execução, ao vivo ou não
+            df = st.session_state.tendencia_df
+            df, n = aovivo.mesclar_barras(df, aovivo.barra_do_dia(ticker))
+            if n:
+                df = atualizar_indicadores(df, n)
+                st.session_state.tendencia_df = df
+
+            # Plot
+            st.subheader("📊 Gráfico do Dólar e Médias Móveis")
+            fig, ax = plt.subplots(figsize=(10, 5))
+            ax.plot(df.index, df["Close"], label="Fechamento", color="black")
+            ax.plot(df.index, df["MA20"], label="MA20", color="blue", linestyle="--")
+            ax.plot(df.index, df["MA50"], label="MA50", color="orange", linestyle="--")
+            ax.legend()
+            ax.set_title("USD/BRL - Últimos 12 meses")
+            ax.set_ylabel("Cotação (R$)")
+            st.pyplot(fig)
+            plt.close(fig)
+
+            # Exibe métricas resumidas
+            st.subheader("📋 Resumo dos Indicadores (última data)")
+            last = df.iloc[-1]
+            st.write(pd.DataFrame({
+                "Indicador": ["MA20", "MA50", "RSI", "MACD", "Volatilidade"],
+                "Valor": [last["MA20"], last["MA50"], last["RSI"], last["MACD"], last["Volatility"]]
+            }).set_index("Indicador"))
+
+            # Interpretação automática
+            st.subheader("🧭 Interpretação da Tendência Atual")
+            tendencia = ""
+            if last["MA20"] > last["MA50"]:
+                tendencia = "alta (curto prazo acima do médio prazo)"
+            elif last["MA20"] < last["MA50"]:
+                tendencia = "baixa (curto prazo abaixo do médio prazo)"
+            else:
+                tendencia = "neutra"
+
+            rsi_status = "sobrecomprado" if last["RSI"] > 70 else "sobrevendido" if last["RSI"] < 30 else "neutro"
+
+            st.success(f"Tendência de {tendencia}. RSI indica mercado {rsi_status}. "
+                       f"Volatilidade atual: {last['Volatility']:.2f}%.")
+            if intervalo:
+                st.caption(f"🔴 Ao vivo • última barra: {df.index[-1]:%d/%m/%Y} • fechamento {last['Close']:.4f}")
+
+        painel()
+
 
+# --- Expõe show() no nível do módulo ---
+def show():
+    DolarTendencia.show()
@@ -1,10 +1,10 @@
 # app_yahoo_search.py
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import requests
 from pathlib import Path
 
+from modules.provedores import obter_provedor
+
 CSV_FILE = Path("empresas_salvas.csv")
 
 # ------------------------------
@@ -27,17 +27,8 @@ def salvar_dados(df):
         return False, str(e)
 
 def buscar_ticker_por_nome(nome_empresa, max_results=8):
-    url = "https://query2.finance.yahoo.com/v1/finance/search"
-    params = {"q": nome_empresa, "lang": "en-US", "region": "US", "quotesCount": max_results, "newsCount": 0}
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
-        "Accept-Language": "en-US,en;q=0.9"
-    }
     try:
-        resp = requests.get(url, params=params, headers=headers, timeout=6)
-        resp.raise_for_status()
-        data = resp.json()
-        return data.get("quotes", []) or []
+        return obter_provedor().buscar(nome_empresa, max_results=max_results)
     except Exception as e:
         st.error(f"Erro na busca no Yahoo: {e}")
         return []
@@ -92,16 +83,12 @@ def show():
 
             st.markdown(f"**Selecionado:** {nome_exibido} — **{symbol}**")
 
-            # tenta coletar dados via yfinance (com fallback)
+            # tenta coletar dados via provedor configurado (yfinance com fallback)
             info = {}
             try:
-                ticker = yf.Ticker(symbol)
-                try:
-                    info = ticker.info or {}
-                except Exception:
-                    info = getattr(ticker, "fast_info", {}) or {}
+                info = obter_provedor().metadados(symbol)
             except Exception as e:
-                st.error(f"Erro ao inicializar yfinance: {e}")
+                st.error(f"Erro ao obter metadados: {e}")
 
             st.write("**Dados básicos (quando disponíveis):**")
             st.write(f"- Nome completo: {info.get('longName', nome_exibido)}")
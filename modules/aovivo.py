@@ -0,0 +1,109 @@
+# modules/aovivo.py
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from modules.provedores import obter_provedor
+
+# Opções de intervalo de atualização (segundos) exibidas nos módulos
+INTERVALOS = {"15 s": 15, "30 s": 30, "1 min": 60, "5 min": 300}
+
+# Barras do dia são memorizadas por processo: N sessões acompanhando o
+# mesmo ticker geram uma única consulta a cada TTL
+TTL_BARRA_S = 10
+
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def _agregar_dia(intradia):
+    """Converte as barras intradiárias do último pregão em uma barra diária."""
+    if intradia is None or intradia.empty:
+        return pd.DataFrame()
+    idx = intradia.index
+    if getattr(idx, "tz", None) is not None:
+        idx = idx.tz_localize(None)
+    dia = idx[-1].normalize()
+    g = intradia[idx.normalize() == dia]
+    return pd.DataFrame({
+        "Open": [g["Open"].iloc[0]],
+        "High": [g["High"].max()],
+        "Low": [g["Low"].min()],
+        "Close": [g["Close"].iloc[-1]],
+        "Volume": [g["Volume"].sum()],
+    }, index=pd.DatetimeIndex([dia], name="Date"))
+
+
+def barras_do_dia(tickers, interval="1m"):
+    """Barras diárias do pregão atual para vários tickers: {ticker: DataFrame}.
+
+    Os tickers fora do memo são buscados numa única chamada em lote ao
+    provedor, então o custo de um ciclo não cresce com o número de ativos.
+    """
+    agora = time.time()
+    barras, faltando = {}, []
+    with _memo_lock:
+        for ticker in tickers:
+            item = _memo.get((ticker, interval))
+            if item is not None and agora - item[0] < TTL_BARRA_S:
+                barras[ticker] = item[1].copy()
+            else:
+                faltando.append(ticker)
+
+    if faltando:
+        try:
+            lote = obter_provedor().historico_lote(faltando, period="1d", interval=interval)
+        except Exception:
+            # Falha momentânea não derruba o painel: tenta de novo no próximo ciclo
+            lote = None
+        if lote is not None:
+            novas = {t: _agregar_dia(lote.get(t)) for t in faltando}
+            with _memo_lock:
+                for ticker, barra in novas.items():
+                    _memo[(ticker, interval)] = (agora, barra)
+            barras.update({t: b.copy() for t, b in novas.items()})
+
+    return {t: barras.get(t, pd.DataFrame()) for t in tickers}
+
+
+def barra_do_dia(ticker, interval="1m"):
+    """Barra diária do pregão atual montada a partir das barras de `interval`."""
+    return barras_do_dia([ticker], interval)[ticker]
+
+
+def mesclar_barras(df, novas):
+    """Atualiza/anexa `novas` em `df` (indexado por data).
+
+    Só as colunas presentes nos dois são escritas; colunas derivadas das
+    linhas novas ficam NaN para o chamador recalcular. Retorna o DataFrame
+    e quantas linhas finais mudaram (0 quando nada mudou).
+    """
+    if novas.empty:
+        return df, 0
+    colunas = [c for c in novas.columns if c in df.columns]
+    novas = novas[colunas]
+
+    existentes = novas.index.intersection(df.index)
+    if len(existentes) == len(novas) and df.loc[existentes, colunas].equals(novas.loc[existentes]):
+        return df, 0
+
+    df = df.copy()
+    df.loc[existentes, colunas] = novas.loc[existentes].values
+    anexar = novas.loc[novas.index.difference(df.index)]
+    if not anexar.empty:
+        df = pd.concat([df, anexar.reindex(columns=df.columns)]).sort_index()
+    primeira = df.index.get_loc(novas.index.min())
+    return df, len(df) - primeira
+
+
+def controles(chave):
+    """Toggle de modo ao vivo + intervalo. Retorna o intervalo (s) ou None."""
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        ativo = st.toggle("🔴 Ao vivo", key=f"{chave}_ao_vivo")
+    with col2:
+        rotulo = st.select_slider("Atualizar a cada:", options=list(INTERVALOS), value="30 s",
+                                  key=f"{chave}_intervalo", disabled=not ativo)
+    return INTERVALOS[rotulo] if ativo else None
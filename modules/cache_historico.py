@@ -0,0 +1,231 @@
+# modules/cache_historico.py
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+from modules.painel_precos import abrir_painel, gravar_painel
+from modules.provedores import PERIODOS, obter_provedor
+
+# Orçamento de memória do cache (MB) – pode ser ajustado por variável de ambiente
+MAX_MB_PADRAO = float(os.environ.get("CACHE_HISTORICO_MAX_MB", "256"))
+
+# Tickers por requisição ao atualizar o painel
+TAMANHO_LOTE = 50
+
+
+def inicio_do_periodo(periodo):
+    """Data inicial de um período no formato do Yahoo ("6mo", "1y", ...)."""
+    return pd.Timestamp.today().normalize() - PERIODOS[periodo]
+
+
+def baixar_ajustado(ticker, start, end):
+    """Download padrão do cache: diário, ajustado por proventos."""
+    return obter_provedor().historico(ticker, start=start, end=end, auto_adjust=True)
+
+
+def baixar_ajustado_lote(tickers, start, end):
+    """Download em lote do painel: {ticker: DataFrame} diário e ajustado."""
+    return obter_provedor().historico_lote(tickers, start=start, end=end, auto_adjust=True)
+
+
+def _cobre(cobertura, inicio, fim):
+    return cobertura is not None and cobertura[0] <= inicio and fim <= cobertura[1]
+
+
+# --- Entrada do cache: histórico de um ticker cobrindo o intervalo [inicio, fim) ---
+class _Entrada:
+    __slots__ = ("df", "inicio", "fim", "nbytes")
+
+    def __init__(self, df, inicio, fim):
+        self.df = df
+        self.inicio = inicio
+        self.fim = fim
+        self.nbytes = int(df.memory_usage(index=True, deep=True).sum())
+
+
+class CacheHistorico:
+    """Cache LRU de históricos diários, compartilhado por todas as sessões.
+
+    Cada ticker guarda um único DataFrame (indexado por data) que cobre o
+    maior intervalo já pedido. Consultas contidas nesse intervalo são
+    atendidas fatiando o superconjunto; consultas maiores baixam apenas os
+    pedaços que faltam. Quando o total de bytes passa do orçamento, os
+    tickers usados há mais tempo são descartados.
+
+    Históricos ajustados também são servidos do painel mapeado em memória
+    (`painel_precos`), gravado por `garantir_painel`: o que está no painel
+    é lido direto dos arquivos compartilhados, sem ocupar o LRU do processo.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = int(max_bytes)
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.hits_painel = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_usados = 0
+
+    # --- Consulta principal ---
+    def obter(self, ticker, start, end, baixar, ajustado=False):
+        """Retorna o histórico de `ticker` em [start, end).
+
+        `baixar(ticker, start, end)` é chamado só para os trechos ausentes
+        e deve devolver um DataFrame indexado por data (pode vir vazio).
+        Com `ajustado=True` (preços ajustados por proventos) os trechos não
+        são emendados: um pedido fora da cobertura baixa o intervalo todo de
+        novo, porque o ajuste de um download antigo não vale para o novo.
+        """
+        inicio, fim = pd.Timestamp(start), pd.Timestamp(end)
+        chave = (ticker, ajustado)
+
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada.inicio <= inicio and fim <= entrada.fim:
+                self._entradas.move_to_end(chave)
+                self.hits += 1
+                return self._fatiar(entrada.df, inicio, fim)
+
+        if ajustado:
+            painel = abrir_painel()
+            if painel is not None and _cobre(painel.cobertura.get(ticker), inicio, fim):
+                with self._lock:
+                    self.hits_painel += 1
+                return painel.janela(ticker, inicio, fim)
+
+        with self._lock:
+            self.misses += 1
+
+        # Download fora do lock para não travar as outras sessões
+        if entrada is None:
+            partes = [baixar(ticker, inicio, fim)]
+            novo_inicio, novo_fim = inicio, fim
+        elif ajustado:
+            novo_inicio, novo_fim = min(inicio, entrada.inicio), max(fim, entrada.fim)
+            partes = [baixar(ticker, novo_inicio, novo_fim)]
+        else:
+            partes = [entrada.df]
+            if inicio < entrada.inicio:
+                partes.append(baixar(ticker, inicio, entrada.inicio))
+            if fim > entrada.fim:
+                partes.append(baixar(ticker, entrada.fim, fim))
+            novo_inicio, novo_fim = min(inicio, entrada.inicio), max(fim, entrada.fim)
+
+        partes = [p for p in partes if p is not None and not p.empty]
+        if partes:
+            df = pd.concat(partes).sort_index()
+            df = df[~df.index.duplicated(keep="last")]
+        else:
+            df = pd.DataFrame()
+
+        # A cobertura para no último pregão encerrado: a barra de hoje ainda
+        # é parcial e nunca é servida do cache como definitiva
+        hoje = pd.Timestamp.today().normalize()
+        novo_fim = min(novo_fim, hoje)
+        guardado = df.loc[df.index < novo_fim] if not df.empty else df
+
+        # Ticker inválido ou sem pregões: não ocupa espaço no cache
+        if not guardado.empty and novo_inicio < novo_fim:
+            self._guardar(chave, _Entrada(guardado, novo_inicio, novo_fim))
+        return self._fatiar(df, inicio, fim)
+
+    # --- Painel compartilhado ---
+    def garantir_painel(self, tickers, inicio, baixar_lote=baixar_ajustado_lote, progresso=None):
+        """Garante no painel o histórico ajustado de `tickers` desde `inicio` até hoje.
+
+        Só baixa os tickers ausentes, com cobertura começando depois de
+        `inicio` ou parada antes de hoje; os demais são reaproveitados do
+        painel vigente. Os downloads saem em lotes de TAMANHO_LOTE por
+        `baixar_lote(tickers, start, end)` e não seguram nenhum lock; só a
+        gravação da nova versão é serializada (entre processos, em
+        `gravar_painel`). `progresso(fração, mensagem)` recebe o andamento.
+        Retorna (painel, tickers sem dados).
+        """
+        inicio = pd.Timestamp(inicio)
+        hoje = pd.Timestamp.today().normalize()
+        painel = abrir_painel()
+        cobertura = painel.cobertura if painel is not None else {}
+        faltando = [t for t in tickers if not _cobre(cobertura.get(t), inicio, hoje)]
+
+        # Ajustado: o intervalo inteiro de cada ticker é baixado de novo, nunca
+        # emendado. Tickers com o mesmo início vão no mesmo lote
+        grupos = {}
+        for ticker in faltando:
+            de = min(inicio, cobertura[ticker][0]) if ticker in cobertura else inicio
+            grupos.setdefault(de, []).append(ticker)
+        lotes = [(de, grupo[k:k + TAMANHO_LOTE]) for de, grupo in grupos.items()
+                 for k in range(0, len(grupo), TAMANHO_LOTE)]
+
+        historicos, novas, sem_dados = {}, {}, []
+        for i, (de, lote) in enumerate(lotes):
+            if progresso is not None:
+                progresso(i / len(lotes), f"Baixando lote {i+1}/{len(lotes)} ({len(lote)} tickers)...")
+            baixados = baixar_lote(lote, de, hoje)
+            for ticker in lote:
+                df = baixados.get(ticker)
+                if df is None or df.empty:
+                    # Se a atualização falhar, a versão antiga continua no painel
+                    if ticker not in cobertura:
+                        sem_dados.append(ticker)
+                    continue
+                historicos[ticker] = df.loc[df.index < hoje]
+                novas[ticker] = (de, hoje)
+
+        if historicos:
+            if progresso is not None:
+                progresso(1.0, "Gravando painel...")
+            gravar_painel(historicos, novas)
+            painel = abrir_painel()
+        return painel, sem_dados
+
+    def _guardar(self, chave, entrada):
+        with self._lock:
+            antiga = self._entradas.pop(chave, None)
+            if antiga is not None:
+                self.bytes_usados -= antiga.nbytes
+            # Entrada maior que o orçamento inteiro não é guardada
+            if entrada.nbytes > self.max_bytes:
+                return
+            self._entradas[chave] = entrada
+            self.bytes_usados += entrada.nbytes
+            while self.bytes_usados > self.max_bytes and self._entradas:
+                _, removida = self._entradas.popitem(last=False)
+                self.bytes_usados -= removida.nbytes
+                self.evictions += 1
+
+    @staticmethod
+    def _fatiar(df, inicio, fim):
+        if df.empty:
+            return df.copy()
+        mask = (df.index >= inicio) & (df.index < fim)
+        return df.loc[mask].copy()
+
+    # --- Métricas ---
+    def estatisticas(self):
+        with self._lock:
+            total = self.hits + self.hits_painel + self.misses
+            return {
+                "hits": self.hits,
+                "hits_painel": self.hits_painel,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes": self.bytes_usados,
+                "max_bytes": self.max_bytes,
+                "entradas": len(self._entradas),
+                "hit_rate": (self.hits + self.hits_painel) / total if total else 0.0,
+            }
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self.bytes_usados = 0
+
+
+# --- Instância única por processo (compartilhada entre sessões do Streamlit) ---
+@st.cache_resource
+def obter_cache():
+    return CacheHistorico(max_bytes=MAX_MB_PADRAO * 1024 * 1024)
@@ -0,0 +1,160 @@
+# modules/coalescencia.py
+import os
+import threading
+from urllib.parse import urlparse
+
+import pandas as pd
+import requests
+import yfinance as yf
+
+# Host lógico usado para todas as chamadas do yfinance
+HOST_YAHOO = "finance.yahoo.com"
+
+# Limite padrão de chamadas simultâneas por host
+LIMITE_HOST_PADRAO = int(os.environ.get("LIMITE_HOST_PADRAO", "4"))
+
+
+def _ler_limites_env():
+    """Lê limites no formato `host=n,host2=m` da variável LIMITES_HOST."""
+    limites = {}
+    for item in os.environ.get("LIMITES_HOST", "").split(","):
+        if "=" not in item:
+            continue
+        host, n = item.split("=", 1)
+        try:
+            limites[host.strip()] = max(1, int(n))
+        except ValueError:
+            continue
+    return limites
+
+
+# --- Chamada em andamento: o líder preenche, os seguidores esperam ---
+class _Chamada:
+    __slots__ = ("evento", "resultado", "erro")
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class Coalescedor:
+    """Agrupa chamadas idênticas simultâneas em uma única requisição.
+
+    A primeira thread a pedir uma chave executa a chamada (líder); as que
+    chegarem enquanto ela está em andamento esperam e recebem o mesmo
+    resultado (ou a mesma exceção). O líder respeita o limite de
+    concorrência do host de destino.
+    """
+
+    def __init__(self, limites=None, limite_padrao=LIMITE_HOST_PADRAO):
+        self._lock = threading.Lock()
+        self._em_voo = {}
+        self._limites = dict(limites or {})
+        self._limite_padrao = limite_padrao
+        self._semaforos = {}
+        self.executadas = 0
+        self.compartilhadas = 0
+
+    def _semaforo(self, host):
+        with self._lock:
+            sem = self._semaforos.get(host)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self._limites.get(host, self._limite_padrao))
+                self._semaforos[host] = sem
+            return sem
+
+    def executar(self, chave, fn, *args, host=None, **kwargs):
+        with self._lock:
+            chamada = self._em_voo.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = _Chamada()
+                self._em_voo[chave] = chamada
+                self.executadas += 1
+            else:
+                self.compartilhadas += 1
+
+        if not lider:
+            chamada.evento.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return _copiar(chamada.resultado)
+
+        try:
+            if host is None:
+                chamada.resultado = fn(*args, **kwargs)
+            else:
+                with self._semaforo(host):
+                    chamada.resultado = fn(*args, **kwargs)
+            # A cópia do líder é feita antes de acordar os seguidores (finally),
+            # então ninguém altera o objeto compartilhado enquanto é copiado
+            return _copiar(chamada.resultado)
+        except Exception as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._em_voo.pop(chave, None)
+            chamada.evento.set()
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "executadas": self.executadas,
+                "compartilhadas": self.compartilhadas,
+                "em_andamento": len(self._em_voo),
+            }
+
+
+def _copiar(resultado):
+    # DataFrames são mutáveis: cada seguidor recebe sua própria cópia
+    if isinstance(resultado, (pd.DataFrame, pd.Series)):
+        return resultado.copy()
+    return resultado
+
+
+def _chave_kwargs(kwargs):
+    return tuple(sorted((k, str(v)) for k, v in kwargs.items()))
+
+
+# --- Instância única por processo ---
+coalescedor = Coalescedor(limites=_ler_limites_env())
+
+
+# yf.download não é thread-safe: cada chamada zera e preenche o dicionário
+# global yfinance.shared._DFS, então downloads diferentes em paralelo podem
+# trocar dados entre tickers. Um download por vez no processo, independente
+# do limite do host (que continua valendo para info e busca)
+_lock_download = threading.Lock()
+
+
+def _download_serializado(tickers, **kwargs):
+    # O lock vem antes do semáforo: quem espera a vez não ocupa vaga do host
+    with _lock_download, coalescedor._semaforo(HOST_YAHOO):
+        return yf.download(tickers, **kwargs)
+
+
+# --- Wrappers para os pontos de chamada externos ---
+def yf_download(ticker, **kwargs):
+    chave = ("yf.download", ticker, _chave_kwargs(kwargs))
+    return coalescedor.executar(chave, _download_serializado, ticker, **kwargs)
+
+
+def yf_info(symbol):
+    def _info():
+        ticker = yf.Ticker(symbol)
+        try:
+            return ticker.info or {}
+        except Exception:
+            return getattr(ticker, "fast_info", {}) or {}
+
+    return coalescedor.executar(("yf.info", symbol), _info, host=HOST_YAHOO)
+
+
+def requests_get(url, params=None, **kwargs):
+    chave = ("GET", url, _chave_kwargs(params or {}))
+    host = urlparse(url).hostname
+    if host and host.endswith(HOST_YAHOO):
+        host = HOST_YAHOO
+    return coalescedor.executar(chave, requests.get, url, params=params, host=host, **kwargs)
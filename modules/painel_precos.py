@@ -0,0 +1,223 @@
+# modules/painel_precos.py
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# fcntl só existe em sistemas Unix: sem ele, gravações são serializadas só no processo
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Diretório padrão dos painéis gravados
+DIR_PAINEL = Path(os.environ.get("PAINEL_PRECOS_DIR", "painel_precos"))
+
+# Um arquivo .npy por campo, em float64: o cache serve o painel como resposta
+# e ela tem que ser igual à do download
+CAMPOS = {"Open": np.float64, "High": np.float64, "Low": np.float64, "Close": np.float64, "Volume": np.float64}
+
+# Versões antigas mantidas para leitores que ainda estão com o mapa aberto
+VERSOES_MANTIDAS = 2
+
+
+def _indice(df):
+    idx = df.index
+    if getattr(idx, "tz", None) is not None:
+        idx = idx.tz_localize(None)
+    return pd.DatetimeIndex(idx)
+
+
+# Gravações do processo; entre processos, flock no arquivo .lock do painel
+_gravacao_lock = threading.Lock()
+
+
+@contextmanager
+def _bloqueio(destino):
+    with _gravacao_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(destino / ".lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def gravar_painel(historicos, cobertura, destino=DIR_PAINEL):
+    """Grava {ticker: DataFrame OHLCV indexado por data} como nova versão do painel.
+
+    `cobertura` é {ticker: (inicio, fim)}, o intervalo [inicio, fim) que
+    cada histórico novo cobre. Os tickers que não estão em `historicos` são
+    copiados da versão vigente, então cada versão é o painel inteiro e só
+    os tickers baixados mudam. Ler a versão vigente, mesclar e trocar o
+    ponteiro acontecem sob um lock entre processos: gravações simultâneas
+    de workers diferentes nunca descartam os tickers umas das outras.
+
+    Layout de `destino`:
+      ATUAL                   nome da versão vigente (trocado atomicamente)
+      .lock                   lock de gravação entre processos
+      <versao>/datas.npy      datetime64[ns], união ordenada das datas
+      <versao>/tickers.json   lista de tickers (ordem das colunas)
+      <versao>/cobertura.json {ticker: [inicio, fim]} em ISO
+      <versao>/<campo>.npy    matriz datas x tickers em ordem Fortran, ou seja,
+                              a série de cada ticker é contígua no arquivo
+    Datas sem pregão do ticker ficam NaN.
+    """
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+    with _bloqueio(destino):
+        # Relida sob o lock: pode ter mudado desde que o chamador abriu o painel
+        _gravar_versao(historicos, cobertura, destino, abrir_painel(destino))
+    return destino
+
+
+def _gravar_versao(historicos, cobertura, destino, base):
+    novos = {t: df for t, df in historicos.items() if df is not None and not df.empty}
+    indices = {t: _indice(df) for t, df in novos.items()}
+
+    antigos = [t for t in base.tickers if t not in novos] if base is not None else []
+    tickers = antigos + [t for t in novos if t not in antigos]
+    cobertura_total = {t: base.cobertura[t] for t in antigos if t in base.cobertura}
+    cobertura_total.update({t: cobertura[t] for t in novos})
+
+    partes = [i.values for i in indices.values()]
+    if antigos:
+        partes.append(base.datas.astype("datetime64[ns]"))
+    datas = pd.DatetimeIndex(np.unique(np.concatenate(partes))) if partes else pd.DatetimeIndex([])
+    linhas_base = datas.get_indexer(base.datas) if antigos else None
+
+    versao = f"{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    pasta = destino / versao
+    pasta.mkdir(parents=True, exist_ok=True)
+
+    np.save(pasta / "datas.npy", datas.values.astype("datetime64[ns]"))
+    with open(pasta / "tickers.json", "w", encoding="utf-8") as f:
+        json.dump(tickers, f)
+    with open(pasta / "cobertura.json", "w", encoding="utf-8") as f:
+        json.dump({t: [pd.Timestamp(i).isoformat(), pd.Timestamp(fim).isoformat()]
+                   for t, (i, fim) in cobertura_total.items()}, f)
+
+    for campo, dtype in CAMPOS.items():
+        matriz = np.lib.format.open_memmap(
+            pasta / f"{campo}.npy", mode="w+", dtype=dtype,
+            shape=(len(datas), len(tickers)), fortran_order=True,
+        )
+        matriz[:] = np.nan
+        origem = base.campo(campo) if antigos and base.tem_campo(campo) else None
+        for j, t in enumerate(tickers):
+            if t in novos:
+                if campo in novos[t].columns:
+                    matriz[datas.get_indexer(indices[t]), j] = novos[t][campo].to_numpy(dtype=dtype)
+            elif origem is not None:
+                # Coluna contígua nos dois arquivos: cópia direta do mapa antigo
+                matriz[linhas_base, j] = origem[:, base.colunas[t]]
+        matriz.flush()
+        del matriz
+
+    # Troca atômica do ponteiro: leitores veem a versão antiga ou a nova, nunca meia
+    tmp = destino / f"ATUAL.{uuid.uuid4().hex}"
+    tmp.write_text(versao, encoding="utf-8")
+    os.replace(tmp, destino / "ATUAL")
+
+    _limpar_versoes(destino, versao)
+
+
+def _limpar_versoes(destino, atual):
+    # Só versões anteriores à atual e paradas há um tempo (não em gravação)
+    versoes = sorted(
+        p for p in destino.iterdir()
+        if p.is_dir() and p.name < atual and time.time() - p.stat().st_mtime > 300
+    )
+    # Em Linux, remover arquivos ainda mapeados é seguro: o mapa segue válido
+    for p in versoes[:max(0, len(versoes) - (VERSOES_MANTIDAS - 1))]:
+        shutil.rmtree(p, ignore_errors=True)
+
+
+class PainelPrecos:
+    """Painel somente leitura aberto como views NumPy sobre arquivos mapeados.
+
+    Abrir não desserializa nada: cada campo é um np.memmap e as páginas só
+    são lidas do disco quando acessadas, e ficam no page cache compartilhado
+    por todos os processos que abrirem o mesmo painel.
+    """
+
+    def __init__(self, pasta):
+        self.pasta = Path(pasta)
+        self.versao = self.pasta.name
+        self.datas = np.load(self.pasta / "datas.npy")
+        with open(self.pasta / "tickers.json", encoding="utf-8") as f:
+            self.tickers = json.load(f)
+        self.colunas = {t: j for j, t in enumerate(self.tickers)}
+        # Versões gravadas antes da cobertura não servem leituras do cache
+        arquivo = self.pasta / "cobertura.json"
+        cobertura = json.loads(arquivo.read_text(encoding="utf-8")) if arquivo.exists() else {}
+        self.cobertura = {t: (pd.Timestamp(i), pd.Timestamp(f)) for t, (i, f) in cobertura.items()}
+        self._campos = {}
+        self._lock = threading.Lock()
+
+    def campo(self, nome):
+        """Matriz datas x tickers do campo (view somente leitura)."""
+        with self._lock:
+            if nome not in self._campos:
+                self._campos[nome] = np.load(self.pasta / f"{nome}.npy", mmap_mode="r")
+            return self._campos[nome]
+
+    def tem_campo(self, nome):
+        return (self.pasta / f"{nome}.npy").exists()
+
+    def _linhas(self, inicio, fim):
+        i0 = 0 if inicio is None else np.searchsorted(self.datas, np.datetime64(pd.Timestamp(inicio)))
+        i1 = len(self.datas) if fim is None else np.searchsorted(self.datas, np.datetime64(pd.Timestamp(fim)))
+        return slice(i0, i1)
+
+    def recorte(self, campo, tickers, inicio=None, fim=None):
+        """Datas e matriz do campo para `tickers` em [inicio, fim).
+
+        Copia só as colunas e linhas pedidas; datas em que nenhum dos
+        tickers teve pregão (vindas de outros ativos do painel) são removidas.
+        """
+        linhas = self._linhas(inicio, fim)
+        matriz = self.campo(campo)[linhas, [self.colunas[t] for t in tickers]]
+        validas = ~np.isnan(matriz).all(axis=1)
+        return pd.DatetimeIndex(self.datas[linhas][validas]), matriz[validas]
+
+    def janela(self, ticker, inicio, fim):
+        """DataFrame OHLCV de um ticker em [inicio, fim), como o provedor devolveria."""
+        linhas, j = self._linhas(inicio, fim), self.colunas[ticker]
+        # A série do ticker é contígua em cada arquivo: uma leitura por campo
+        df = pd.DataFrame(
+            {c: self.campo(c)[linhas, j] for c in CAMPOS if self.tem_campo(c)},
+            index=pd.DatetimeIndex(self.datas[linhas], name="Date"),
+        )
+        return df.dropna(subset=["Close"])
+
+
+# --- Painéis abertos por processo (reabre quando a versão muda) ---
+# Um por diretório; na prática só o painel compartilhado DIR_PAINEL
+_abertos = {}
+_abertos_lock = threading.Lock()
+
+
+def abrir_painel(origem=DIR_PAINEL):
+    """Versão vigente do painel em `origem`, ou None se nada foi gravado ainda."""
+    origem = Path(origem).resolve()
+    try:
+        versao = (origem / "ATUAL").read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    with _abertos_lock:
+        painel = _abertos.get(origem)
+        if painel is None or painel.versao != versao:
+            painel = PainelPrecos(origem / versao)
+            _abertos[origem] = painel
+        return painel
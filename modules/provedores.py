@@ -0,0 +1,294 @@
+# modules/provedores.py
+import json
+from abc import ABC, abstractmethod
+import os
+import threading
+import time
+import zlib
+from io import StringIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from modules.coalescencia import requests_get, yf_download, yf_info
+
+# Seleção do provedor: "yahoo" (padrão) ou "local"
+PROVEDOR_PADRAO = os.environ.get("PROVEDOR_DADOS", "yahoo").lower()
+DADOS_LOCAIS_DIR = Path(os.environ.get("DADOS_LOCAIS_DIR", "dados_locais"))
+# Latência artificial do provedor local (ms), útil para testes de carga
+LATENCIA_LOCAL_MS = float(os.environ.get("DADOS_LOCAIS_LATENCIA_MS", "0"))
+
+URL_FLUXO_B3 = "https://www.dadosdemercado.com.br/fluxo"
+URL_BUSCA_YAHOO = "https://query2.finance.yahoo.com/v1/finance/search"
+
+COLUNAS_OHLCV = ["Open", "High", "Low", "Close", "Volume"]
+
+# Períodos aceitos pelo yfinance convertidos em deslocamento de datas
+PERIODOS = {
+    "1d": pd.DateOffset(days=1),
+    "5d": pd.DateOffset(days=5),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+# Frequência das barras sintéticas intradiárias
+_FREQ_INTRADIARIA = {"1m": "min", "2m": "2min", "5m": "5min", "15m": "15min", "30m": "30min", "60m": "h", "1h": "h"}
+
+
+class ProvedorDados(ABC):
+    """Interface comum para as fontes de dados usadas pelos módulos.
+
+    `historico` devolve um DataFrame indexado por data com colunas OHLCV
+    planas; `fluxo_b3` devolve a tabela bruta do fluxo por investidor e o
+    texto de atualização (ou None).
+    """
+
+    nome = "base"
+
+    @abstractmethod
+    def historico(self, ticker, start=None, end=None, period=None, interval="1d", **kwargs):
+        ...
+
+    def historico_lote(self, tickers, **kwargs):
+        """{ticker: DataFrame} para vários tickers; provedores podem buscar em lote."""
+        return {t: self.historico(t, **kwargs) for t in tickers}
+
+    @abstractmethod
+    def metadados(self, symbol):
+        ...
+
+    @abstractmethod
+    def buscar(self, nome, max_results=8):
+        ...
+
+    @abstractmethod
+    def fluxo_b3(self):
+        ...
+
+
+# --- Yahoo Finance / dadosdemercado (rede) ---
+class ProvedorYahoo(ProvedorDados):
+    nome = "yahoo"
+
+    def historico(self, ticker, start=None, end=None, period=None, interval="1d", **kwargs):
+        params = {k: v for k, v in {"start": start, "end": end, "period": period}.items() if v is not None}
+        df = yf_download(ticker, interval=interval, progress=False, **params, **kwargs)
+        # yfinance recente devolve colunas (Price, Ticker) mesmo para um único ativo
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = df.columns.get_level_values(0)
+        return df
+
+    def historico_lote(self, tickers, start=None, end=None, period=None, interval="1d", **kwargs):
+        # Uma única requisição ao Yahoo para todos os tickers
+        tickers = list(tickers)
+        params = {k: v for k, v in {"start": start, "end": end, "period": period}.items() if v is not None}
+        df = yf_download(" ".join(tickers), interval=interval, progress=False, group_by="ticker",
+                         **params, **kwargs)
+        if not isinstance(df.columns, pd.MultiIndex):
+            return {tickers[0]: df} if len(tickers) == 1 else {}
+        presentes = set(df.columns.get_level_values(0))
+        return {t: df[t].dropna(how="all") for t in tickers if t in presentes}
+
+    def metadados(self, symbol):
+        return yf_info(symbol)
+
+    def buscar(self, nome, max_results=8):
+        params = {"q": nome, "lang": "en-US", "region": "US", "quotesCount": max_results, "newsCount": 0}
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+            "Accept-Language": "en-US,en;q=0.9"
+        }
+        resp = requests_get(URL_BUSCA_YAHOO, params=params, headers=headers, timeout=6)
+        resp.raise_for_status()
+        return resp.json().get("quotes", []) or []
+
+    def fluxo_b3(self):
+        response = requests_get(URL_FLUXO_B3, timeout=15, headers={"User-Agent": "Mozilla/5.0"})
+        response.raise_for_status()
+        soup = BeautifulSoup(response.text, "html.parser")
+
+        table = soup.find("table")
+        if table is None:
+            return None, None
+        df = pd.read_html(StringIO(str(table)))[0]
+
+        update_info = soup.find("p", class_="text-muted")
+        return df, (update_info.text.strip() if update_info else None)
+
+
+# --- Arquivos locais (gravados ou sintéticos) ---
+class ProvedorLocal(ProvedorDados):
+    """Lê dados de `DADOS_LOCAIS_DIR`; gera séries sintéticas quando faltam.
+
+    Estrutura esperada:
+      historico/<TICKER>.csv   Date,Open,High,Low,Close,Volume
+      metadados.json           {"PETR4.SA": {"longName": ...}, ...}
+      busca.json               [{"symbol": ..., "shortname": ..., "exchange": ...}, ...]
+      fluxo_b3.csv             tabela no mesmo formato do site
+    As séries sintéticas são determinísticas (semente derivada do ticker).
+    """
+
+    nome = "local"
+
+    def __init__(self, base_dir=DADOS_LOCAIS_DIR, sintetico=True, latencia_ms=LATENCIA_LOCAL_MS):
+        self.base_dir = Path(base_dir)
+        self.sintetico = sintetico
+        self.latencia_ms = latencia_ms
+        self._gravados = {}
+        self._lock = threading.Lock()
+
+    def _latencia(self):
+        if self.latencia_ms > 0:
+            time.sleep(self.latencia_ms / 1000)
+
+    @staticmethod
+    def _semente(*partes):
+        return zlib.crc32("|".join(str(p) for p in partes).encode("utf-8"))
+
+    def _ler_json(self, nome, padrao):
+        path = self.base_dir / nome
+        if not path.exists():
+            return padrao
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    # --- Históricos ---
+    def _diario_gravado(self, ticker):
+        with self._lock:
+            if ticker in self._gravados:
+                return self._gravados[ticker]
+        path = self.base_dir / "historico" / f"{ticker}.csv"
+        df = None
+        if path.exists():
+            df = pd.read_csv(path, parse_dates=["Date"], index_col="Date").sort_index()
+        with self._lock:
+            self._gravados[ticker] = df
+        return df
+
+    def _diario_sintetico(self, ticker, fim):
+        # Passeio aleatório geométrico a partir de uma origem fixa: o mesmo
+        # ticker gera sempre a mesma série, seja qual for o intervalo pedido
+        # (um gerador por campo, para que o prefixo não dependa de `fim`)
+        datas = pd.bdate_range("2000-01-03", fim, name="Date")
+        n = len(datas)
+        rng = {campo: np.random.default_rng(self._semente(ticker, campo)) for campo in COLUNAS_OHLCV}
+        base = 10 + 90 * np.random.default_rng(self._semente(ticker, "base")).random()
+        close = base * np.exp(np.cumsum(rng["Close"].normal(0.0003, 0.018, n)))
+        open_ = close * np.exp(rng["Open"].normal(0, 0.005, n))
+        return pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + np.abs(rng["High"].normal(0, 0.01, n))),
+            "Low": np.minimum(open_, close) * (1 - np.abs(rng["Low"].normal(0, 0.01, n))),
+            "Close": close,
+            "Volume": rng["Volume"].integers(100_000, 10_000_000, n),
+        }, index=datas)
+
+    def _intradiario_sintetico(self, ticker, inicio, fim, freq):
+        diario = self._diario_sintetico(ticker, fim)
+        partes = []
+        for dia in pd.bdate_range(inicio.normalize(), fim):
+            idx = pd.date_range(dia + pd.Timedelta(hours=10), dia + pd.Timedelta(hours=17), freq=freq, inclusive="left")
+            idx = idx[(idx >= inicio) & (idx < fim)]
+            if idx.empty:
+                continue
+            anterior = diario["Close"].asof(dia - pd.Timedelta(days=1))
+            rng = np.random.default_rng(self._semente(ticker, dia.date(), freq))
+            close = anterior * np.exp(np.cumsum(rng.normal(0, 0.001, len(idx))))
+            partes.append(pd.DataFrame({
+                "Open": np.r_[anterior, close[:-1]],
+                "High": close * 1.0005,
+                "Low": close * 0.9995,
+                "Close": close,
+                "Volume": rng.integers(1_000, 100_000, len(idx)),
+            }, index=pd.DatetimeIndex(idx, name="Datetime")))
+        if not partes:
+            return pd.DataFrame(columns=COLUNAS_OHLCV)
+        return pd.concat(partes)
+
+    def historico(self, ticker, start=None, end=None, period=None, interval="1d", **kwargs):
+        self._latencia()
+        agora = pd.Timestamp.now()
+        fim = pd.Timestamp(end) if end is not None else agora
+        if start is not None:
+            inicio = pd.Timestamp(start)
+        elif period in PERIODOS:
+            inicio = fim - PERIODOS[period]
+        else:
+            inicio = pd.Timestamp("2000-01-01")
+
+        if interval != "1d":
+            if not self.sintetico or interval not in _FREQ_INTRADIARIA:
+                return pd.DataFrame(columns=COLUNAS_OHLCV)
+            return self._intradiario_sintetico(ticker, inicio, fim, _FREQ_INTRADIARIA[interval])
+
+        df = self._diario_gravado(ticker)
+        if df is None:
+            if not self.sintetico:
+                return pd.DataFrame(columns=COLUNAS_OHLCV)
+            df = self._diario_sintetico(ticker, fim)
+        elif start is None and period is not None and not df.empty:
+            # Dados gravados no passado: período conta a partir da última data
+            fim = min(fim, df.index[-1] + pd.Timedelta(days=1))
+            inicio = fim - PERIODOS.get(period, pd.DateOffset(years=100))
+
+        return df.loc[(df.index >= inicio) & (df.index < fim), COLUNAS_OHLCV].copy()
+
+    # --- Metadados e busca ---
+    def metadados(self, symbol):
+        self._latencia()
+        return dict(self._ler_json("metadados.json", {}).get(symbol, {"longName": symbol}))
+
+    def buscar(self, nome, max_results=8):
+        self._latencia()
+        quotes = self._ler_json("busca.json", None)
+        if quotes is None:
+            pasta = self.base_dir / "historico"
+            quotes = [{"symbol": p.stem, "shortname": p.stem, "exchange": "LOCAL"} for p in sorted(pasta.glob("*.csv"))]
+        termo = nome.lower()
+        encontrados = [
+            q for q in quotes
+            if termo in str(q.get("symbol", "")).lower()
+            or termo in str(q.get("shortname") or q.get("longname") or "").lower()
+        ]
+        return encontrados[:max_results]
+
+    # --- Fluxo B3 ---
+    def fluxo_b3(self):
+        self._latencia()
+        path = self.base_dir / "fluxo_b3.csv"
+        if path.exists():
+            return pd.read_csv(path, dtype=str), f"Arquivo local: {path}"
+        if not self.sintetico:
+            return None, None
+
+        datas = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=250)
+        rng = np.random.default_rng(self._semente("fluxo_b3"))
+        investidores = ["Estrangeiro", "Institucional", "Pessoa física", "Inst. Financeira", "Outros"]
+        df = pd.DataFrame(rng.normal(0, 5e8, (len(datas), len(investidores))), columns=investidores)
+        # Soma zero por dia, como no mercado (quem compra é quem vende do outro lado)
+        df["Outros"] -= df.sum(axis=1)
+        df.insert(0, "Data", datas.strftime("%d/%m/%Y"))
+        return df.iloc[::-1].reset_index(drop=True), "Dados sintéticos (provedor local)"
+
+
+_PROVEDORES = {"yahoo": ProvedorYahoo, "local": ProvedorLocal}
+_instancias = {}
+_instancias_lock = threading.Lock()
+
+
+def obter_provedor(nome=None):
+    """Instância compartilhada do provedor configurado em PROVEDOR_DADOS."""
+    nome = (nome or PROVEDOR_PADRAO).lower()
+    if nome not in _PROVEDORES:
+        raise ValueError(f"Provedor de dados desconhecido: {nome}")
+    with _instancias_lock:
+        if nome not in _instancias:
+            _instancias[nome] = _PROVEDORES[nome]()
+        return _instancias[nome]
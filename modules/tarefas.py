@@ -0,0 +1,139 @@
+# modules/tarefas.py
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+MAX_WORKERS_PADRAO = int(os.environ.get("TAREFAS_MAX_WORKERS", "4"))
+# Quanto tempo (s) um resultado concluído continua servindo pedidos idênticos
+TTL_RESULTADO_PADRAO = float(os.environ.get("TAREFAS_TTL_S", "900"))
+
+
+class Tarefa:
+    """Estado de uma análise executada fora da thread do script."""
+
+    def __init__(self, chave):
+        self.id = uuid.uuid4().hex
+        self.chave = chave
+        self.status = "pendente"
+        self.progresso = 0.0
+        self.mensagem = "Na fila..."
+        self.resultado = None
+        self.erro = None
+        self.concluida_em = None
+
+    @property
+    def finalizada(self):
+        return self.status in ("concluida", "erro")
+
+    def reportar(self, progresso, mensagem=None):
+        """Chamado pela função da tarefa para atualizar o progresso (0 a 1)."""
+        self.progresso = min(max(float(progresso), 0.0), 1.0)
+        if mensagem is not None:
+            self.mensagem = mensagem
+
+
+class ExecutorTarefas:
+    """Pool de threads compartilhado por todas as sessões.
+
+    Tarefas com a mesma chave (parâmetros da análise) são deduplicadas:
+    enquanto uma estiver na fila, executando ou concluída há menos de
+    `ttl` segundos, novos pedidos recebem a mesma Tarefa. Tarefas com erro
+    não são reaproveitadas.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS_PADRAO, ttl=TTL_RESULTADO_PADRAO, max_guardadas=128):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tarefa")
+        self._lock = threading.Lock()
+        self._por_id = OrderedDict()
+        self._por_chave = {}
+        self.ttl = ttl
+        self.max_guardadas = max_guardadas
+
+    def submeter(self, fn, *args, chave, **kwargs):
+        """Agenda `fn(tarefa, *args, **kwargs)` e devolve a Tarefa."""
+        with self._lock:
+            existente = self._por_chave.get(chave)
+            if existente is not None and self._reaproveitavel(existente):
+                self._por_id.move_to_end(existente.id)
+                return existente
+
+            tarefa = Tarefa(chave)
+            self._por_id[tarefa.id] = tarefa
+            self._por_chave[chave] = tarefa
+            self._descartar_antigas()
+
+        self._pool.submit(self._executar, tarefa, fn, args, kwargs)
+        return tarefa
+
+    def obter(self, tarefa_id):
+        if tarefa_id is None:
+            return None
+        with self._lock:
+            return self._por_id.get(tarefa_id)
+
+    def _reaproveitavel(self, tarefa):
+        if tarefa.status == "erro":
+            return False
+        if tarefa.status == "concluida":
+            return time.time() - tarefa.concluida_em < self.ttl
+        return True
+
+    def _descartar_antigas(self):
+        # Remove as tarefas finalizadas mais antigas além do limite
+        excedente = len(self._por_id) - self.max_guardadas
+        for tarefa_id in list(self._por_id):
+            if excedente <= 0:
+                break
+            tarefa = self._por_id[tarefa_id]
+            if not tarefa.finalizada:
+                continue
+            del self._por_id[tarefa_id]
+            if self._por_chave.get(tarefa.chave) is tarefa:
+                del self._por_chave[tarefa.chave]
+            excedente -= 1
+
+    @staticmethod
+    def _executar(tarefa, fn, args, kwargs):
+        tarefa.status = "executando"
+        tarefa.mensagem = "Processando..."
+        # Status muda por último: quem vê "concluida"/"erro" (submeter, painel
+        # de progresso) já encontra resultado, progresso e concluida_em prontos
+        try:
+            tarefa.resultado = fn(tarefa, *args, **kwargs)
+            tarefa.progresso = 1.0
+            tarefa.concluida_em = time.time()
+            tarefa.status = "concluida"
+        except Exception as e:
+            tarefa.erro = e
+            tarefa.concluida_em = time.time()
+            tarefa.status = "erro"
+
+
+# --- Instância única por processo ---
+@st.cache_resource
+def obter_executor():
+    return ExecutorTarefas()
+
+
+def acompanhar(tarefa_id, intervalo=1.0, executor=None):
+    """Mostra o progresso da tarefa sem bloquear o restante da página.
+
+    Só o fragmento é reexecutado a cada `intervalo`; quando a tarefa termina,
+    dispara um rerun completo para a página desenhar o resultado. `executor`
+    é o ExecutorTarefas da tarefa (padrão: o compartilhado).
+    """
+    executor = executor or obter_executor()
+
+    @st.fragment(run_every=intervalo)
+    def _painel():
+        tarefa = executor.obter(tarefa_id)
+        if tarefa is None or tarefa.finalizada:
+            st.rerun()
+        st.progress(tarefa.progresso, text=tarefa.mensagem)
+
+    _painel()